@@ -1,59 +1,175 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json, os, requests, asyncio
+import json, os, requests, asyncio, hashlib, time
 from dotenv import load_dotenv
 from watchparty_vote import WatchpartyVote
+from selection import SelectionRouter, MAX_OPTIONS
+from storage import GuildStore, DATA_DIR, DEFAULT_PARTITION, file_lock, write_json
+from sync import create_change_bus
+from stats import apply_movie, top
+from suggest import SuggestionIndex
 
 #Environment and Setup
+START_TIME = time.perf_counter()
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 OMDB_API_KEY = os.getenv("OMDB_API_KEY")
 
-MOVIE_DB_FILE = "movies.json"
-WATCHPARTY_FILE = "categories.json"
+DEFAULT_GUILD_ID = os.getenv("DEFAULT_GUILD_ID")
+COMMAND_HASH_FILE = os.path.join(DATA_DIR, "command_tree.json")
+ready_reported = False  # Time-to-ready is printed on the first on_ready only
+
+# Sharding: set SHARD_COUNT to shard the gateway, and SHARD_IDS (e.g. "0,2") to own a subset per process
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+SHARD_IDS = os.getenv("SHARD_IDS")
 
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
-
-#Helper Functions 
-def load_watchparties():
-    if not os.path.exists(WATCHPARTY_FILE):
-        with open(WATCHPARTY_FILE, "w") as f:
-            json.dump(["Horror", "Anime", "SciFi"], f)
-    with open(WATCHPARTY_FILE, "r") as f:
-        return json.load(f)
-
-def save_watchparties(watchparties):
-    with open(WATCHPARTY_FILE, "w") as f:
-        json.dump(watchparties, f, indent=2)
-
-def load_movie_db():
-    if not os.path.exists(MOVIE_DB_FILE):
-        with open(MOVIE_DB_FILE, "w") as f:
-            json.dump({}, f)
-    with open(MOVIE_DB_FILE, "r") as f:
-        return json.load(f)
-
-def save_movie_db(db):
-    with open(MOVIE_DB_FILE, "w") as f:
-        json.dump(db, f, indent=2)
-
-# On Ready Event
-@bot.event
-async def on_ready():
-    print("🔥 on_ready fired!")
+if SHARD_COUNT:
+    bot = commands.AutoShardedBot(
+        command_prefix="!",
+        intents=intents,
+        shard_count=int(SHARD_COUNT),
+        shard_ids=[int(i) for i in SHARD_IDS.split(",")] if SHARD_IDS else None,
+    )
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents)
+
+selections = SelectionRouter()
+
+# Writes are broadcast to the other shard processes so their cached partitions get dropped
+bus = create_change_bus()
+store = GuildStore(default_guild_id=DEFAULT_GUILD_ID, bus=bus)
 
-    # Load your WatchpartyVote Cog properly
-    await bot.add_cog(WatchpartyVote(bot))
+# Without DEFAULT_GUILD_ID the migrated data is on disk but no guild ever reads it
+if not store.default_guild_id and DEFAULT_PARTITION in store.partition_keys():
+    print(
+        f"⚠️ DEFAULT_GUILD_ID is not set, so no guild is served the '{DEFAULT_PARTITION}' partition "
+        f"(your pre-partition movies). Set it in .env to the ID of the guild that data belongs to."
+    )
+
+#Helper Functions (each guild reads and writes only its own partition)
+def load_watchparties(guild_id):
+    return store.get(guild_id).watchparties()
+
+def load_movie_db(guild_id):
+    return store.get(guild_id).movies()
+
+# Apply a change to the latest on-disk movies and stats under the partition's file locks
+# (mutate receives both and must keep the stats aggregates in step with the movies)
+async def update_movie_db(guild_id, mutate):
+    return await store.get(guild_id).update_async(("movies", "stats"), mutate)
+
+# Similarity index over every movie in a guild (built off the event loop on first use)
+async def suggestion_index(guild_id):
+    return await store.get(guild_id).index_async("suggestions", SuggestionIndex.from_db)
+
+# Keep an already-built similarity index in step with an insert or removal
+def update_suggestion_index(guild_id, watchparty, movies, added):
+    index = store.get(guild_id).cached_index("suggestions")
+    if index is None:
+        return
+    for movie in movies:
+        if added:
+            index.add(watchparty, movie)
+        else:
+            index.remove(watchparty, movie)
+
+# Startup Helpers
+# Hash of every slash command's name, description and options as Discord would receive them
+def command_tree_hash():
+    payload = sorted(
+        (cmd.to_dict(bot.tree) for cmd in bot.tree.get_commands()),
+        key=lambda c: c["name"],
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+# Hash recorded by the last successful sync (read under the lock other shard processes use)
+def read_command_hash():
+    with file_lock(COMMAND_HASH_FILE):
+        if not os.path.exists(COMMAND_HASH_FILE):
+            return None
+        with open(COMMAND_HASH_FILE, "r") as f:
+            return json.load(f).get("hash")
+
+def write_command_hash(value):
+    with file_lock(COMMAND_HASH_FILE):
+        write_json(COMMAND_HASH_FILE, {"hash": value})
+
+# Only AutoShardedBot has shard_ids; a plain Bot (or an auto-sharded one before connecting) owns everything
+def owned_shard_ids():
+    return getattr(bot, "shard_ids", None)
+
+# Sync slash commands only when their signatures changed since the last successful sync
+async def sync_command_tree():
+    # With several shard processes, only the one owning shard 0 talks to the command API
+    shard_ids = owned_shard_ids()
+    if shard_ids is not None and 0 not in shard_ids:
+        return
+
+    current = command_tree_hash()
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    # The lock is never held across the (slow, rate-limited) sync call itself
+    if read_command_hash() == current:
+        print("✅ Slash commands unchanged — skipping sync")
+        return
 
-    # Optionally sync app commands here if you're mixing slash and prefix
     try:
         synced = await bot.tree.sync()
-        print(f"✅ Synced {len(synced)} slash command(s)")
     except Exception as e:
         print(f"Error syncing commands: {e}")
+        return
+
+    write_command_hash(current)
+    print(f"✅ Synced {len(synced)} slash command(s)")
+
+# Is this guild's partition served by one of our shards?
+def owns_partition(key):
+    if key == DEFAULT_PARTITION:
+        return True
+    if not key.isdigit():
+        return False
+    shard_ids = owned_shard_ids()
+    if shard_ids is None:
+        return True
+    return ((int(key) >> 22) % bot.shard_count) in shard_ids
+
+# Load documents and build the similarity index
+async def warm_partition(partition):
+    await partition.warm_async()
+    await partition.index_async("suggestions", SuggestionIndex.from_db)
+
+# Warm this process's guild partitions in parallel (file reads run in worker threads)
+async def warm_partitions():
+    keys = [k for k in store.partition_keys() if owns_partition(k)][:store.max_guilds]
+    partitions = [store.partition(k) for k in keys]
+    await asyncio.gather(*(warm_partition(p) for p in partitions))
+    return len(partitions)
+
+# Setup Hook: runs once per process before the gateway connects (never on reconnects)
+@bot.event
+async def setup_hook():
+    # Start listening for other processes' changes
+    bus.start()
+
+    # Load your WatchpartyVote Cog once
+    if bot.get_cog("WatchpartyVote") is None:
+        await bot.add_cog(WatchpartyVote(bot, store))
+
+    warmed, _ = await asyncio.gather(warm_partitions(), sync_command_tree())
+    print(f"🔥 Warmed {warmed} guild partition(s) in {time.perf_counter() - START_TIME:.2f}s")
+
+# On Ready Event (fires again after every reconnect, so keep it light)
+@bot.event
+async def on_ready():
+    global ready_reported
+    if not ready_reported:
+        ready_reported = True
+        print(f"⏱️ Bot is ready! Logged in as {bot.user} in {time.perf_counter() - START_TIME:.2f}s")
+    else:
+        print(f"🔁 Reconnected as {bot.user}")
 
 #Error Visibility for silent command errors
 @bot.event
@@ -73,21 +189,28 @@ async def on_message(message):
             f"Here’s what I can do:\n"
             f"• ➕ `/add_movie` to add films to your watchparty\n"
             f"• 📊 `/list_top10` to see the latest additions\n"
-            f"• 🍿 More coming soon: ratings, suggestions, polls, and schedules!\n\n"
+            f"• 📈 `/stats` to see watchparty sizes, top contributors, genres and decades\n"
+            f"• 🔮 `/suggest` for similar movies your watchparty hasn't seen\n"
+            f"• 🍿 More coming soon: ratings, polls, and schedules!\n\n"
             f"Try typing `/` to view all commands or ask me what’s playing!"
         )
         await message.add_reaction("🎥")
    
-    if message.content.startswith("/"):
-        return
+    # Only prefix commands need the command parser; skip everything else
+    if message.content.startswith(bot.command_prefix):
+        await bot.process_commands(message)
 
-    await bot.process_commands(message)
+# Route select menu / button clicks to the pending selection prompt
+@bot.event
+async def on_interaction(interaction):
+    await selections.dispatch(interaction)
 
 # Discord Auto complete Command for Showing Top 10 Movie List
+@app_commands.guild_only()  # Libraries belong to a server; DMs have none
 @bot.tree.command(name="list_top10", description="List the top 10 recent movies from a Watchparty 🎥")
 @app_commands.describe(watchparty="Select a watchparty to view its top 10 movies")
 async def list_top10(interaction: discord.Interaction, watchparty: str):
-    db = load_movie_db()
+    db = load_movie_db(interaction.guild_id)
     movies = db.get(watchparty)
 
     if not movies:
@@ -109,11 +232,12 @@ async def list_top10(interaction: discord.Interaction, watchparty: str):
 async def autocomplete_watchparty_top(interaction: discord.Interaction, current: str):
     return [
         app_commands.Choice(name=wp, value=wp)
-        for wp in load_watchparties() if current.lower() in wp.lower()
+        for wp in load_watchparties(interaction.guild_id) if current.lower() in wp.lower()
     ]
 
 # Add Movie with Search and Fallback of Search parameters
 # Slash Command to Add a Movie to a Watchparty
+@app_commands.guild_only()
 @bot.tree.command(name="add_movie", description="Search and add one or more movies to a watchparty 🎞️")
 @app_commands.describe(
     watchparty="Choose a watchparty category",
@@ -142,49 +266,31 @@ async def slash_add_movie(interaction: discord.Interaction, watchparty: str, mov
         return
 
     # 🎞️ Step 3: Show numbered list of options
+    options = search_results[:5]
     msg = f"🔍 Found multiple matches for **{movie_title}**:\n\n"
-    for i, m in enumerate(search_results[:5], 1):
+    for i, m in enumerate(options, 1):
         msg += f"{i}. {m['Title']} ({m['Year']})\n"
 
-    msg += (
-        "\nReply with the number(s) to add:\n"
-        "• Use formats like `1`, `1 2`, `1,3`, or `1 and 3`\n"
-        "• Type `all` to add every listed result\n"
-        "• Type `cancel` to abort"
-    )
-    await interaction.followup.send(msg)
-
-    # 🧠 Step 4: Define check for reply input
-    def check(msg):
-        return (
-            msg.author == interaction.user and
-            msg.channel == interaction.channel
-        )
+    msg += "\nPick the result(s) to add below, press **All** to add every listed result, or **Cancel** to abort."
 
+    # 🧠 Step 4: Wait for the user's pick from the select menu
     try:
-        reply_msg = await bot.wait_for("message", timeout=30.0, check=check)
-        user_input = reply_msg.content.strip().lower()
-
-        if user_input == "cancel":
-            await interaction.followup.send("❎ Addition cancelled.")
-            return
-
-        # 🔎 Step 5: Parse input into selected indexes
-        import re
-        if user_input == "all":
-            selected_indexes = list(range(1, min(6, len(search_results) + 1)))
-        else:
-            raw = re.findall(r"\d+", user_input)
-            selected_indexes = [int(r) for r in raw if 1 <= int(r) <= len(search_results[:5])]
-
-        if not selected_indexes:
-            await interaction.followup.send("❌ Couldn't interpret your selection. Try `/add_movie` again.")
-            return
-
+        selected_indexes = await selections.prompt(
+            interaction, msg, [f"{m['Title']} ({m['Year']})" for m in options]
+        )
     except asyncio.TimeoutError:
         await interaction.followup.send("⏰ Timed out — try `/add_movie` again.")
         return
 
+    # 🔎 Step 5: Handle cancel or an empty pick
+    if selected_indexes is None:
+        await interaction.followup.send("❎ Addition cancelled.")
+        return
+
+    if not selected_indexes:
+        await interaction.followup.send("❌ Couldn't interpret your selection. Try `/add_movie` again.")
+        return
+
     # 📦 Step 6: Fetch full metadata and insert each movie
     success_list = []
     for i in selected_indexes:
@@ -210,10 +316,11 @@ async def slash_add_movie(interaction: discord.Interaction, watchparty: str, mov
 async def autocomplete_watchparty_add(interaction: discord.Interaction, current: str):
     return [
         app_commands.Choice(name=wp, value=wp)
-        for wp in load_watchparties() if current.lower() in wp.lower()
+        for wp in load_watchparties(interaction.guild_id) if current.lower() in wp.lower()
     ]
 
 # Remove Movie from List. Admin can remove all, where basic users remove ones they added. 
+@app_commands.guild_only()
 @bot.tree.command(name="remove_movie", description="Choose and remove one or more movie versions 🗑️")
 @app_commands.describe(
     watchparty="Select a watchparty category",
@@ -222,7 +329,7 @@ async def autocomplete_watchparty_add(interaction: discord.Interaction, current:
 async def remove_movie(interaction: discord.Interaction, watchparty: str, movie_title: str):
     await interaction.response.defer(thinking=True)
 
-    db = load_movie_db()
+    db = load_movie_db(interaction.guild_id)
     user_name = interaction.user.name
     is_admin = interaction.user.guild_permissions.administrator
 
@@ -243,70 +350,139 @@ async def remove_movie(interaction: discord.Interaction, watchparty: str, movie_
         )
         return
 
-    # 🎞️ Present numbered list to user
+    # 🎞️ Present numbered list to user (select menus hold at most 25 options)
+    total_matches = len(matches)
+    matches = matches[:MAX_OPTIONS]
     msg = f"🔍 Found multiple versions of **{movie_title}** in **{watchparty}**:\n\n"
     for i, m in enumerate(matches, 1):
         msg += f"{i}. {m['title']} ({m['year']}) — added by {m['added_by']}\n"
 
-    msg += (
-        "\nReply with the number(s) to remove:\n"
-        "• `1`, `1 2`, `1,2`, `1 and 2` all work\n"
-        "• Type `all` to remove every match\n"
-        "• Type `cancel` to abort"
-    )
-    await interaction.followup.send(msg)
-
-    # 🧠 Check function for user reply
-    def check(msg):
-        return (
-            msg.author == interaction.user and
-            msg.channel == interaction.channel
+    if total_matches > len(matches):
+        msg += (
+            f"\n⚠️ Showing the first {len(matches)} of {total_matches} matches — "
+            f"**All** only removes these. Run `/remove_movie` again for the rest.\n"
         )
 
-    try:
-        reply_msg = await bot.wait_for("message", timeout=30.0, check=check)
-        user_input = reply_msg.content.strip().lower()
-
-        if user_input == "cancel":
-            await interaction.followup.send("❎ Removal cancelled.")
-            return
-
-        # 🎛️ Parse user input with regex
-        import re
-        if user_input == "all":
-            selected_indexes = list(range(1, len(matches) + 1))
-        else:
-            raw = re.findall(r"\d+", user_input)
-            selected_indexes = [int(r) for r in raw if 1 <= int(r) <= len(matches)]
-
-        if not selected_indexes:
-            await interaction.followup.send("❌ Couldn't interpret your selection. Please try again.")
-            return
+    msg += "\nPick the version(s) to remove below, press **All** to remove every listed match, or **Cancel** to abort."
 
+    # 🧠 Wait for the user's pick from the select menu
+    try:
+        selected_indexes = await selections.prompt(
+            interaction, msg, [f"{m['title']} ({m['year']}) — {m['added_by']}" for m in matches]
+        )
     except asyncio.TimeoutError:
         await interaction.followup.send("⏰ Timed out — try `/remove_movie` again.")
         return
 
+    if selected_indexes is None:
+        await interaction.followup.send("❎ Removal cancelled.")
+        return
+
+    if not selected_indexes:
+        await interaction.followup.send("❌ Couldn't interpret your selection. Please try again.")
+        return
+
     # 🗑️ Remove only selected items
     to_remove = [matches[i - 1] for i in selected_indexes]
-    db[watchparty] = [m for m in db[watchparty] if m not in to_remove]
-    save_movie_db(db)
+
+    def remove_selected(db, stats):
+        kept, removed = [], []
+        for m in db.get(watchparty, []):
+            if m in to_remove:
+                apply_movie(stats, watchparty, m, -1)
+                removed.append(m)
+            else:
+                kept.append(m)
+        db[watchparty] = kept
+        return removed
+
+    removed = await update_movie_db(interaction.guild_id, remove_selected)
+    update_suggestion_index(interaction.guild_id, watchparty, removed, added=False)
 
     titles = ", ".join([f"**{m['title']}** ({m['year']})" for m in to_remove])
-    await interaction.followup.send(f"✅ Removed {len(to_remove)} item(s): {titles}")
+    remaining = total_matches - len(to_remove)
+    note = f"\n↪️ {remaining} more match(es) remain — run `/remove_movie` again." if total_matches > len(matches) else ""
+    await interaction.followup.send(f"✅ Removed {len(to_remove)} item(s): {titles}{note}")
 
 # Discord Auto complete Command for Watchparty Remove Movies
 @remove_movie.autocomplete("watchparty")
 async def autocomplete_watchparty_remove(interaction: discord.Interaction, current: str):
     return [
         app_commands.Choice(name=wp, value=wp)
-        for wp in load_watchparties() if current.lower() in wp.lower()
+        for wp in load_watchparties(interaction.guild_id) if current.lower() in wp.lower()
+    ]
+
+# Library Statistics, read straight from the incrementally maintained aggregates
+@app_commands.guild_only()
+@bot.tree.command(name="stats", description="See how big each watchparty is and what's in the library 📈")
+async def library_stats(interaction: discord.Interaction):
+    stats = store.get(interaction.guild_id).stats()
+
+    if not stats["total"]:
+        await interaction.response.send_message("📭 No movies have been added yet.", ephemeral=True)
+        return
+
+    def lines(pairs):
+        return "\n".join(f"{name}: **{count}**" for name, count in pairs) or "—"
+
+    embed = discord.Embed(
+        title="📈 Watchparty Library Stats",
+        description=f"Total Movies: **{stats['total']}**",
+        color=discord.Color.dark_red()
+    )
+    embed.add_field(name="🎉 Watchparties", value=lines(top(stats["watchparties"], 10)), inline=True)
+    embed.add_field(name="🙋 Top Contributors", value=lines(top(stats["added_by"])), inline=True)
+    embed.add_field(name="🎭 Top Genres", value=lines(top(stats["genres"])), inline=True)
+    embed.add_field(name="📅 Decades", value=lines(sorted(stats["decades"].items())), inline=False)
+
+    await interaction.response.send_message(embed=embed)
+
+# Similar Movies: closest genre/era matches from other watchparties that this one hasn't got yet
+@app_commands.guild_only()
+@bot.tree.command(name="suggest", description="Get movie suggestions for a watchparty 🔮")
+@app_commands.describe(
+    watchparty="Select the watchparty to find new movies for",
+    movie_title="Optional: a movie already in that watchparty to find lookalikes of"
+)
+async def suggest(interaction: discord.Interaction, watchparty: str, movie_title: str = None):
+    index = await suggestion_index(interaction.guild_id)
+
+    seed_row = None
+    if movie_title:
+        seed_row = index.find(watchparty, movie_title)
+        if seed_row is None:
+            await interaction.response.send_message(
+                f"❌ **{movie_title}** isn't in **{watchparty}**.", ephemeral=True
+            )
+            return
+
+    suggestions = index.suggest(watchparty, seed_row)
+    if not suggestions:
+        await interaction.response.send_message(
+            f"🤷 No suggestions for **{watchparty}** yet — add more movies to other watchparties!",
+            ephemeral=True
+        )
+        return
+
+    basis = f"**{movie_title}**" if movie_title else f"everything in **{watchparty}**"
+    response = f"🔮 Movies like {basis} that **{watchparty}** hasn't seen:\n\n" + "\n\n".join(
+        f"🎬 **{m['title']}** ({m['year']}) — {round(score * 100)}% match\n"
+        f"Genre: {m['genre']}\nFrom: {', '.join(parties)}"
+        for m, score, parties in suggestions
+    )
+
+    await interaction.response.send_message(response)
+
+# Discord Auto complete Command for Watchparty Suggestions
+@suggest.autocomplete("watchparty")
+async def autocomplete_watchparty_suggest(interaction: discord.Interaction, current: str):
+    return [
+        app_commands.Choice(name=wp, value=wp)
+        for wp in load_watchparties(interaction.guild_id) if current.lower() in wp.lower()
     ]
 
 # Insert Movie Helper
 async def insert_movie(interaction, watchparty, data):
-    db = load_movie_db()
-
     movie = {
         "title": data.get("Title", "Untitled"),
         "year": data.get("Year", "Unknown"),
@@ -315,21 +491,27 @@ async def insert_movie(interaction, watchparty, data):
         "added_by": interaction.user.name
     }
 
-    if watchparty not in db:
-        db[watchparty] = []
-
     title_norm = movie["title"].lower().strip()
     year_norm = movie["year"].strip()
-    if (title_norm, year_norm) in {
-        (entry["title"].lower().strip(), entry["year"].strip()) for entry in db[watchparty]
-    }:
+
+    # Duplicate check and append happen together against the latest copy on disk
+    def add_if_new(db, stats):
+        entries = db.setdefault(watchparty, [])
+        if (title_norm, year_norm) in {
+            (entry["title"].lower().strip(), entry["year"].strip()) for entry in entries
+        }:
+            return False
+        entries.append(movie)
+        apply_movie(stats, watchparty, movie, 1)
+        return True
+
+    if not await update_movie_db(interaction.guild_id, add_if_new):
         await interaction.followup.send(
             f"⚠️ **{movie['title']}** ({movie['year']}) is already in **{watchparty}**!"
         )
         return
 
-    db[watchparty].append(movie)
-    save_movie_db(db)
+    update_suggestion_index(interaction.guild_id, watchparty, [movie], added=True)
 
     await interaction.followup.send(
         f"✅ **{movie['title']}** ({movie['year']}) added to **{watchparty}** by **{movie['added_by']}**\n"
@@ -339,6 +521,3 @@ async def insert_movie(interaction, watchparty, data):
 
 # Bot Run
 bot.run(DISCORD_TOKEN)
-@bot.event
-async def on_ready():
-    print(f"Bot is ready! Logged in as {bot.user}")
\ No newline at end of file
@@ -1,7 +1,9 @@
-import json
 import os
 from datetime import datetime
 import getpass
+from storage import GuildStore, DOCUMENTS
+from sync import create_change_bus
+from stats import apply_movie
 
 LOG_FILE = "deduplication_log.txt"
 
@@ -25,41 +27,41 @@ def is_valid_movie(movie):
         added_by and added_by != "unknown"
     ])
 
-def deduplicate_and_validate(filepath="movies.json"):
-    with open(filepath, "r") as f:
-        data = json.load(f)
-
+def deduplicate_and_validate(partition):
     username = getpass.getuser()
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     removed_invalid = []
     removed_duplicates = []
 
-    for watchparty in data:
-        seen = set()
-        cleaned = []
+    def clean(data, stats):
+        for watchparty in data:
+            seen = set()
+            cleaned = []
 
-        for movie in data[watchparty]:
-            key = (movie.get("title", "").lower().strip(), movie.get("year", "").strip())
+            for movie in data[watchparty]:
+                key = (movie.get("title", "").lower().strip(), movie.get("year", "").strip())
 
-            if not is_valid_movie(movie):
-                removed_invalid.append((watchparty, movie))
-                continue
+                if not is_valid_movie(movie):
+                    removed_invalid.append((watchparty, movie))
+                    apply_movie(stats, watchparty, movie, -1)
+                    continue
 
-            if key in seen:
-                removed_duplicates.append((watchparty, movie))
-                continue
+                if key in seen:
+                    removed_duplicates.append((watchparty, movie))
+                    apply_movie(stats, watchparty, movie, -1)
+                    continue
 
-            seen.add(key)
-            cleaned.append(movie)
+                seen.add(key)
+                cleaned.append(movie)
 
-        data[watchparty] = cleaned
+            data[watchparty] = cleaned
 
-    with open(filepath, "w") as f:
-        json.dump(data, f, indent=2)
+    # Locked read-modify-write of movies + stats; running bot processes are told to drop their copies
+    partition.update(("movies", "stats"), clean)
 
     # 📓 Write to log file
     with open(LOG_FILE, "a", encoding="utf-8") as log:
-        log.write(f"\n--- Deduplication Run: {timestamp} by {username} ---\n")
+        log.write(f"\n--- Deduplication Run: {timestamp} by {username} [partition {partition.key}] ---\n")
         log.write(f"Removed {len(removed_duplicates)} duplicate(s) and {len(removed_invalid)} invalid movie(s).\n")
 
         if removed_duplicates:
@@ -74,8 +76,14 @@ def deduplicate_and_validate(filepath="movies.json"):
                 year = movie.get("year", "<no year>")
                 log.write(f" - [{watchparty}] {title} ({year}) — missing or malformed fields\n")
 
-    print(f"✅ Cleaned {len(removed_duplicates)} duplicate(s) and {len(removed_invalid)} invalid movie(s). Log saved to {LOG_FILE}")
+    print(f"✅ [{partition.key}] Cleaned {len(removed_duplicates)} duplicate(s) and {len(removed_invalid)} invalid movie(s). Log saved to {LOG_FILE}")
 
 if __name__ == "__main__":
     print("🔍 Running deduplication and validation...")
-    deduplicate_and_validate()
\ No newline at end of file
+
+    # Each guild partition is cleaned independently
+    store = GuildStore(bus=create_change_bus())
+    movies_file = DOCUMENTS["movies"][0]
+    for key in store.partition_keys():
+        if os.path.exists(os.path.join(store.root, key, movies_file)):
+            deduplicate_and_validate(store.partition(key))
\ No newline at end of file
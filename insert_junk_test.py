@@ -1,4 +1,6 @@
-import json
+from storage import GuildStore, DEFAULT_PARTITION
+from sync import create_change_bus
+from stats import apply_movie
 
 TEST_ENTRIES = [
     {
@@ -15,20 +17,19 @@ TEST_ENTRIES = [
     },
 ]
 
-# Inject these into a test category
+# Inject these into a test category of the default guild partition
 category = "Horror"
 
-with open("movies.json", "r") as f:
-    data = json.load(f)
+def inject(data, stats):
+    # If the category doesn't exist yet, create it
+    if category not in data:
+        data[category] = []
 
-# If the category doesn't exist yet, create it
-if category not in data:
-    data[category] = []
+    # Append the test entries (and count them, so the dedup tool's removals balance out)
+    data[category].extend(TEST_ENTRIES)
+    for entry in TEST_ENTRIES:
+        apply_movie(stats, category, entry, 1)
 
-# Append the test entries
-data[category].extend(TEST_ENTRIES)
-
-with open("movies.json", "w") as f:
-    json.dump(data, f, indent=2)
+GuildStore(bus=create_change_bus()).partition(DEFAULT_PARTITION).update(("movies", "stats"), inject)
 
 print(f"🧪 Injected {len(TEST_ENTRIES)} invalid test entries into '{category}'")
\ No newline at end of file
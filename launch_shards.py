@@ -0,0 +1,36 @@
+# Runs bot.py as several processes, each owning a slice of the gateway shards
+import argparse
+import os
+import subprocess
+import sys
+
+# Split shard IDs round-robin so every process gets a similar share of guilds
+def plan_shards(shard_count, processes):
+    groups = [[] for _ in range(min(processes, shard_count))]
+    for shard_id in range(shard_count):
+        groups[shard_id % len(groups)].append(shard_id)
+    return groups
+
+def launch(shard_count, processes):
+    children = []
+    for shard_ids in plan_shards(shard_count, processes):
+        env = dict(os.environ, SHARD_COUNT=str(shard_count), SHARD_IDS=",".join(map(str, shard_ids)))
+        print(f"🚀 Starting bot process for shard(s) {env['SHARD_IDS']} of {shard_count}")
+        children.append(subprocess.Popen([sys.executable, "bot.py"], env=env))
+
+    try:
+        for child in children:
+            child.wait()
+    except KeyboardInterrupt:
+        print("🛑 Stopping shard processes...")
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run HorrorWatchBot across several shard processes.")
+    parser.add_argument("--shards", type=int, required=True, help="Total number of gateway shards")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Number of bot processes")
+    args = parser.parse_args()
+    launch(args.shards, args.processes)
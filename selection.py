@@ -0,0 +1,163 @@
+# Component-based selection prompts (select menus + buttons) for multi-pick commands
+import asyncio
+import itertools
+import time
+
+import discord
+
+SELECTION_TIMEOUT = 30.0  # Seconds a prompt stays answerable
+SWEEP_INTERVAL = 5.0      # How often the sweeper looks for expired prompts
+MAX_OPTIONS = 25          # Discord's limit for options in a single select menu
+CUSTOM_ID_PREFIX = "sel"  # custom_id format: sel:<session_id>:<action>
+
+# One pending prompt waiting on a single user's answer
+class SelectionSession:
+    def __init__(self, session_id, user_id, channel_id, option_count, timeout):
+        self.session_id = session_id
+        self.owner = (user_id, channel_id)
+        self.option_count = option_count
+        self.expires_at = time.monotonic() + timeout
+        self.future = asyncio.get_running_loop().create_future()
+        self.view = None
+        self.message = None
+
+    def custom_id(self, action):
+        return f"{CUSTOM_ID_PREFIX}:{self.session_id}:{action}"
+
+# Routes component interactions to pending prompts with a dict lookup
+class SelectionRouter:
+    def __init__(self, timeout=SELECTION_TIMEOUT, sweep_interval=SWEEP_INTERVAL):
+        self.timeout = timeout
+        self.sweep_interval = sweep_interval
+
+        # Pending prompts by session ID (the middle part of each custom_id)
+        self.sessions = {}  # Format: {session_id: SelectionSession}
+
+        # Latest prompt per user/channel so a new command replaces the old one
+        self.by_owner = {}  # Format: {(user_id, channel_id): session_id}
+
+        self._ids = itertools.count(1)
+        self._sweeper = None
+
+    # 🎛️ Post a prompt and wait for the user's pick
+    async def prompt(self, interaction, content, labels, placeholder="Choose one or more…"):
+        """
+        Sends `content` with a select menu of `labels` plus All/Cancel buttons.
+        Returns the chosen 1-based indexes, or None if the user cancelled.
+        Raises asyncio.TimeoutError if nobody answers before the prompt expires.
+        """
+        labels = labels[:MAX_OPTIONS]
+        owner = (interaction.user.id, interaction.channel_id)
+
+        # Only one open prompt per user per channel
+        previous = self.by_owner.get(owner)
+        if previous is not None:
+            await self._close(self.sessions.get(previous), result=None)
+
+        session = SelectionSession(
+            str(next(self._ids)), interaction.user.id, interaction.channel_id, len(labels), self.timeout
+        )
+        session.view = self._build_view(session, labels, placeholder)
+        self.sessions[session.session_id] = session
+        self.by_owner[owner] = session.session_id
+
+        try:
+            session.message = await interaction.followup.send(content, view=session.view, wait=True)
+        except Exception:
+            # Nothing was posted, so nobody can answer — drop the session before re-raising
+            await self._close(session, edit=False)
+            raise
+
+        self._ensure_sweeper()
+
+        return await session.future
+
+    # Build the select menu and buttons for a session (callbacks are handled by dispatch)
+    def _build_view(self, session, labels, placeholder):
+        view = discord.ui.View(timeout=None)
+        view.add_item(discord.ui.Select(
+            custom_id=session.custom_id("pick"),
+            placeholder=placeholder,
+            min_values=1,
+            max_values=len(labels),
+            options=[
+                discord.SelectOption(label=f"{i}. {label}"[:100], value=str(i))
+                for i, label in enumerate(labels, 1)
+            ],
+        ))
+        view.add_item(discord.ui.Button(
+            custom_id=session.custom_id("all"), label="All", emoji="📦", style=discord.ButtonStyle.primary
+        ))
+        view.add_item(discord.ui.Button(
+            custom_id=session.custom_id("cancel"), label="Cancel", emoji="❎", style=discord.ButtonStyle.secondary
+        ))
+        return view
+
+    # 🔀 Entry point for every interaction the bot receives
+    async def dispatch(self, interaction):
+        if interaction.type != discord.InteractionType.component:
+            return
+
+        custom_id = (interaction.data or {}).get("custom_id", "")
+        prefix, _, rest = custom_id.partition(":")
+        if prefix != CUSTOM_ID_PREFIX:
+            return
+
+        session_id, _, action = rest.partition(":")
+        session = self.sessions.get(session_id)
+
+        if session is None:
+            await interaction.response.send_message("⏰ This selection has expired.", ephemeral=True)
+            return
+
+        if session.owner[0] != interaction.user.id:
+            await interaction.response.send_message("🙅 This selection isn't yours.", ephemeral=True)
+            return
+
+        if action == "pick":
+            values = interaction.data.get("values", [])
+            result = sorted(int(v) for v in values if 1 <= int(v) <= session.option_count)
+        elif action == "all":
+            result = list(range(1, session.option_count + 1))
+        else:
+            result = None
+
+        # Strip the components in the same response that acknowledges the click
+        await interaction.response.edit_message(view=None)
+        await self._close(session, result=result, edit=False)
+
+    # Remove a session from both indexes and hand its result to the waiting command
+    async def _close(self, session, result=None, error=None, edit=True):
+        if session is None:
+            return
+
+        self.sessions.pop(session.session_id, None)
+        if self.by_owner.get(session.owner) == session.session_id:
+            del self.by_owner[session.owner]
+
+        session.view.stop()
+
+        if edit and session.message is not None:
+            try:
+                await session.message.edit(view=None)
+            except discord.HTTPException:
+                pass  # Message deleted or token expired — nothing left to tidy
+
+        if not session.future.done():
+            if error is not None:
+                session.future.set_exception(error)
+            else:
+                session.future.set_result(result)
+
+    # ⏲️ One background task expires every prompt instead of a timer per prompt
+    def _ensure_sweeper(self):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self):
+        while self.sessions:
+            await asyncio.sleep(self.sweep_interval)
+            now = time.monotonic()
+            expired = [s for s in self.sessions.values() if s.expires_at <= now]
+            for session in expired:
+                await self._close(session, error=asyncio.TimeoutError())
@@ -0,0 +1,80 @@
+# Library statistics kept up to date one movie at a time (never by rescanning movies.json)
+import os
+import re
+
+from storage import GuildStore, DOCUMENTS, register_document
+
+PLACEHOLDERS = {"", "unknown", "n/a"}
+COUNTERS = ["watchparties", "added_by", "genres", "decades"]
+
+def empty_stats():
+    stats = {"total": 0}
+    for counter in COUNTERS:
+        stats[counter] = {}
+    return stats
+
+# Split OMDb's "Drama, Fantasy, Horror" into individual genre tokens
+def genre_tokens(genre):
+    return [g.strip() for g in (genre or "").split(",") if g.strip().lower() not in PLACEHOLDERS]
+
+# "1982" -> "1980s"; series ranges like "2005–2008" use their first year
+def decade_of(year):
+    match = re.match(r"\s*(\d{4})", year or "")
+    if not match:
+        return "Unknown"
+    return f"{int(match.group(1)) // 10 * 10}s"
+
+def _bump(counts, key, delta):
+    counts[key] = counts.get(key, 0) + delta
+    if counts[key] <= 0:
+        del counts[key]
+
+# ➕➖ Apply one added (delta=1) or removed (delta=-1) movie to the aggregates
+def apply_movie(stats, watchparty, movie, delta):
+    stats["total"] = max(stats["total"] + delta, 0)
+    _bump(stats["watchparties"], watchparty, delta)
+    _bump(stats["added_by"], movie.get("added_by", "Unknown"), delta)
+    _bump(stats["decades"], decade_of(movie.get("year")), delta)
+    for token in genre_tokens(movie.get("genre")):
+        _bump(stats["genres"], token, delta)
+
+# Full rebuild from a movies document (only for partitions without stats.json, or to repair drift)
+def build_stats(db):
+    stats = empty_stats()
+    for watchparty, movies in db.items():
+        for movie in movies:
+            apply_movie(stats, watchparty, movie, 1)
+    return stats
+
+# 🧮 Partitions without stats.json get theirs built from movies; it's persisted by the next movie write
+def default_stats(partition):
+    db = partition._read("movies")
+    if not isinstance(db, dict):
+        return empty_stats()  # Pre-category list format; upgrade_movies.py recounts after converting it
+    return build_stats(db)
+
+register_document("stats", "stats.json", default_stats)
+
+# Recount a partition from scratch, under the same locks as every other movies + stats write
+def rebuild_stats(partition):
+    def recount(db, stats):
+        stats.clear()
+        stats.update(build_stats(db))
+
+    partition.update(("movies", "stats"), recount)
+
+# Highest counts first, ties broken alphabetically
+def top(counts, limit=5):
+    return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+
+# Repair tool: `python stats.py` recounts every partition if stats.json ever drifts (e.g. after a hand edit)
+if __name__ == "__main__":
+    from sync import create_change_bus
+
+    store = GuildStore(bus=create_change_bus())
+    movies_file = DOCUMENTS["movies"][0]
+    for key in store.partition_keys():
+        if os.path.exists(os.path.join(store.root, key, movies_file)):
+            partition = store.partition(key)
+            rebuild_stats(partition)
+            print(f"🧮 [{key}] Rebuilt stats: {partition.stats()['total']} movie(s)")
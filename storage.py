@@ -0,0 +1,347 @@
+# Per-guild partitioned storage for movies, watchparty categories, schedules and stats
+import asyncio
+import json
+import os
+import shutil
+from collections import OrderedDict
+from contextlib import contextmanager, ExitStack
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_DIR = "data"
+GUILDS_DIR = os.path.join(DATA_DIR, "guilds")
+DEFAULT_PARTITION = "default"
+DEFAULT_WATCHPARTIES = ["Horror", "Anime", "SciFi"]
+
+# Documents stored in every partition: {name: (file name, factory(partition) used when the file is missing)}
+DOCUMENTS = {
+    "movies": ("movies.json", lambda partition: {}),
+    "watchparties": ("categories.json", lambda partition: list(DEFAULT_WATCHPARTIES)),
+    "schedule": ("watchparty_schedule.json", lambda partition: {}),
+}
+
+# Let other modules add their own per-partition documents (e.g. stats.py)
+def register_document(name, filename, factory):
+    DOCUMENTS[name] = (filename, factory)
+
+# Pre-partition files at the repo root, migrated into the default partition once
+LEGACY_FILES = ["movies.json", "categories.json", "watchparty_schedule.json"]
+
+# Eviction budget defaults (overridable with MAX_CACHED_GUILDS / MAX_CACHED_MOVIES)
+MAX_CACHED_GUILDS = 64
+MAX_CACHED_MOVIES = 50000
+
+# 🔒 Exclusive lock shared by every bot process and tool touching `path`
+@contextmanager
+def file_lock(path):
+    # Lock a sidecar file: the data file itself is replaced on every write
+    with open(f"{path}.lock", "a+") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+# Write JSON to a temp file and swap it in so readers never see half a file
+def write_json(path, data, indent=2):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+
+# One guild's documents, each loaded from disk the first time it's needed
+class GuildPartition:
+    def __init__(self, key, path, on_change=None, on_resize=None):
+        self.key = key
+        self.path = path
+        self.on_change = on_change  # Called with (partition_key, document_name) after each write
+        self.on_resize = on_resize  # Called with (partition, delta) when the cached movie count changes
+        self.weight = 0             # Movies currently held in memory (the eviction budget's unit)
+        self._docs = {}  # Format: {document_name: loaded JSON}
+        self._indexes = {}  # Format: {index_name: in-memory index derived from movies}
+
+        # Bumped by invalidate(): a read that started before a bump must not be cached
+        self._invalidations = {}  # Format: {document_name: count}
+        self._invalidated_all = 0
+
+    def _file(self, name):
+        return os.path.join(self.path, DOCUMENTS[name][0])
+
+    def _read(self, name):
+        path = self._file(name)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+        return DOCUMENTS[name][1](self)
+
+    def _write(self, name, doc):
+        os.makedirs(self.path, exist_ok=True)
+        write_json(self._file(name), doc, indent=4 if name == "schedule" else 2)
+
+    def _changed(self, name):
+        if self.on_change:
+            self.on_change(self.key, name)
+
+    def load(self, name):
+        if name not in self._docs:
+            self._docs[name] = self._read(name)
+            if name == "movies":
+                self._reweigh()
+        return self._docs[name]
+
+    # Locked read-modify-write on fresh copies from disk; touches no cached state, so it's thread-safe
+    def _locked_update(self, names, mutate, replace=False):
+        os.makedirs(self.path, exist_ok=True)
+
+        # Always lock in the same order so two writers can't deadlock
+        with ExitStack() as locks:
+            for name in sorted(names):
+                locks.enter_context(file_lock(self._file(name)))
+
+            docs = {name: self._read(name) for name in names}
+            result = mutate(*(docs[name] for name in names))
+            if replace:
+                # mutate returned brand-new document(s) instead of editing in place
+                replaced = result if len(names) > 1 else (result,)
+                docs = dict(zip(names, replaced))
+            for name in names:
+                self._write(name, docs[name])
+
+        return docs, result
+
+    # Invalidation count for a document, taken before a worker-thread read starts
+    def _stamp(self, name):
+        return self._invalidations.get(name, 0) + self._invalidated_all
+
+    def _apply(self, docs, stamps=None):
+        for name, doc in docs.items():
+            if stamps is not None and self._stamp(name) != stamps[name]:
+                # Another process wrote after our lock was released; its notice got here first,
+                # so our copy is already older than the disk — drop it rather than cache it
+                self._docs.pop(name, None)
+                if name == "movies":
+                    self._indexes.clear()
+            else:
+                self._docs[name] = doc
+        if "movies" in docs:
+            self._reweigh()
+        for name in docs:
+            self._changed(name)
+
+    # ✏️ Read-modify-write under the lock, starting from the latest copy on disk
+    def update(self, names, mutate, replace=False):
+        """
+        Reloads one document name (or a tuple of names) while holding their file
+        locks, applies `mutate(*docs)` in place and writes them back, so concurrent
+        writers in other processes never clobber each other and related documents
+        change together. Returns whatever `mutate` returns.
+
+        With replace=True, `mutate` returns the new document (a tuple of them for
+        several names) instead of editing in place — for format migrations.
+
+        Blocks while waiting for the locks; coroutines should use update_async().
+        """
+        names = (names,) if isinstance(names, str) else tuple(names)
+        docs, result = self._locked_update(names, mutate, replace)
+        self._apply(docs)
+        return result
+
+    # Same as update(), but the lock wait and file I/O run in a worker thread so the event loop keeps going
+    async def update_async(self, names, mutate):
+        names = (names,) if isinstance(names, str) else tuple(names)
+        stamps = {name: self._stamp(name) for name in names}
+        docs, result = await asyncio.to_thread(self._locked_update, names, mutate)
+        self._apply(docs, stamps)
+        return result
+
+    # Read every document not cached yet in a worker thread, then cache them on the event loop
+    async def warm_async(self):
+        missing = [name for name in DOCUMENTS if name not in self._docs]
+        stamps = {name: self._stamp(name) for name in missing}
+        docs = await asyncio.to_thread(lambda: {name: self._read(name) for name in missing})
+
+        # Skip anything invalidated while the read was in flight; it's reread on first use
+        for name, doc in docs.items():
+            if self._stamp(name) == stamps[name]:
+                self._docs.setdefault(name, doc)
+        if "movies" in docs:
+            self._reweigh()
+
+    # 🗂️ In-memory index built from movies on first use (in a worker thread), then kept current by the caller
+    async def index_async(self, name, build):
+        if name in self._indexes:
+            return self._indexes[name]
+
+        movies = self.movies()
+        index = await asyncio.to_thread(build, movies)
+
+        # Movies changed while building: answer with this index but don't cache it,
+        # since the caller's incremental update for that change had nothing to apply to
+        if self._docs.get("movies") is not movies:
+            return index
+        return self._indexes.setdefault(name, index)
+
+    # The index if it has been built, so callers can update it in place (or skip if it hasn't)
+    def cached_index(self, name):
+        return self._indexes.get(name)
+
+    # Forget a cached document so the next access rereads it from disk
+    def invalidate(self, name=None):
+        if name is None:
+            self._docs.clear()
+            self._invalidated_all += 1
+        else:
+            self._docs.pop(name, None)
+            self._invalidations[name] = self._invalidations.get(name, 0) + 1
+
+        # Indexes derived from movies are rebuilt after someone else changed them
+        if name in (None, "movies"):
+            self._indexes.clear()
+            self._reweigh()
+
+    def movies(self):
+        return self.load("movies")
+
+    def watchparties(self):
+        return self.load("watchparties")
+
+    def schedule(self):
+        return self.load("schedule")
+
+    def stats(self):
+        return self.load("stats")
+
+    # Recount the cached movies after the movies document was loaded, replaced or dropped
+    def _reweigh(self):
+        movies = self._docs.get("movies") or {}
+        if isinstance(movies, list):
+            weight = len(movies)  # Pre-category format, until upgrade_movies.py converts it
+        else:
+            weight = sum(len(v) for v in movies.values())
+        delta, self.weight = weight - self.weight, weight
+        if delta and self.on_resize:
+            self.on_resize(self, delta)
+
+# LRU cache of guild partitions; cold guilds are dropped and reloaded on demand
+class GuildStore:
+    def __init__(self, root=GUILDS_DIR, max_guilds=None, max_movies=None, default_guild_id=None, bus=None):
+        self.root = root
+
+        # Optional change bus (see sync.py) that tells other processes what we wrote
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe(self.invalidate)
+        self.max_guilds = max_guilds or int(os.getenv("MAX_CACHED_GUILDS", MAX_CACHED_GUILDS))
+        self.max_movies = max_movies or int(os.getenv("MAX_CACHED_MOVIES", MAX_CACHED_MOVIES))
+
+        # Guild whose data lives in the default partition (the migrated global files)
+        self.default_guild_id = str(default_guild_id) if default_guild_id else None
+
+        self._cache = OrderedDict()  # Format: {partition_key: GuildPartition}, coldest first
+        self._total_movies = 0  # Running sum of every cached partition's weight
+        self.migrate_legacy()
+
+    # Map a guild ID to its partition key (DMs have no guild, so they never get one)
+    def partition_key(self, guild_id):
+        if guild_id is None:
+            raise ValueError("Direct messages have no guild partition")
+        if str(guild_id) == self.default_guild_id:
+            return DEFAULT_PARTITION
+        return str(guild_id)
+
+    def get(self, guild_id):
+        return self.partition(self.partition_key(guild_id))
+
+    # Partition by its on-disk key ("default" or a guild ID), as listed by partition_keys()
+    def partition(self, key):
+        partition = self._cache.get(key)
+
+        if partition is None:
+            partition = GuildPartition(
+                key, os.path.join(self.root, key), on_change=self._publish, on_resize=self._resized
+            )
+            self._cache[key] = partition
+            self._evict()
+        else:
+            self._cache.move_to_end(key)
+
+        return partition
+
+    # A cached partition's movie count changed (loaded, written or invalidated)
+    def _resized(self, partition, delta):
+        if self._cache.get(partition.key) is not partition:
+            return  # Already evicted; its movies no longer count against the budget
+        self._total_movies += delta
+        self._evict()
+
+    # Drop the least recently used partitions once over the guild or movie budget
+    def _evict(self):
+        while len(self._cache) > 1 and (
+            len(self._cache) > self.max_guilds or self._total_movies > self.max_movies
+        ):
+            _, cold = self._cache.popitem(last=False)
+            self._total_movies -= cold.weight
+
+    def _publish(self, key, name):
+        if self.bus is not None:
+            self.bus.publish(key, name)
+
+    # Another process changed a document; drop our copy if we hold one (key None means every partition)
+    def invalidate(self, key, name=None):
+        if key is None:
+            for partition in self._cache.values():
+                partition.invalidate(name)
+            return
+
+        partition = self._cache.get(key)
+        if partition is not None:
+            partition.invalidate(name)
+
+    def cached_keys(self):
+        return list(self._cache.keys())
+
+    # Every partition that exists on disk, loaded or not
+    def partition_keys(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if (name == DEFAULT_PARTITION or name.isdigit()) and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    # 📦 Copy the old global JSON files into the default partition (runs once)
+    def migrate_legacy(self):
+        default_path = os.path.join(self.root, DEFAULT_PARTITION)
+        if os.path.isdir(default_path):
+            return
+
+        legacy = [name for name in LEGACY_FILES if os.path.exists(name)]
+        if not legacy:
+            return
+
+        # Several shard processes may start at once; only one of them copies
+        os.makedirs(self.root, exist_ok=True)
+        with file_lock(os.path.join(self.root, "migrate")):
+            if os.path.isdir(default_path):
+                return
+            os.makedirs(f"{default_path}.tmp", exist_ok=True)
+            for name in legacy:
+                shutil.copy2(name, os.path.join(f"{default_path}.tmp", name))
+            os.replace(f"{default_path}.tmp", default_path)
+
+        print(
+            f"📦 Migrated {', '.join(legacy)} into the '{DEFAULT_PARTITION}' partition at {default_path}. "
+            f"Set DEFAULT_GUILD_ID to the guild it belongs to, or no guild will see it."
+        )
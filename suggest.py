@@ -0,0 +1,163 @@
+# "Similar movies" suggestions: cosine similarity over genre + release-decade features
+import re
+
+import numpy as np
+
+from stats import genre_tokens
+
+FIRST_DECADE = 1900
+DECADE_BINS = 14          # 1900s … 2030s
+YEAR_WEIGHT = 0.5         # How much the release era counts next to genre
+NEIGHBOUR_DECADE = 0.5    # Adjacent decades count as partly similar
+INITIAL_CAPACITY = 256
+
+def movie_key(movie):
+    return (movie.get("title", "").lower().strip(), movie.get("year", "").strip())
+
+# Decade block of the feature vector, smeared onto neighbouring decades
+def decade_features(year):
+    features = np.zeros(DECADE_BINS, dtype=np.float32)
+    match = re.match(r"\s*(\d{4})", year or "")
+    if not match:
+        return features
+
+    b = min(max((int(match.group(1)) - FIRST_DECADE) // 10, 0), DECADE_BINS - 1)
+    features[b] = 1.0
+    if b > 0:
+        features[b - 1] = NEIGHBOUR_DECADE
+    if b < DECADE_BINS - 1:
+        features[b + 1] = NEIGHBOUR_DECADE
+    return features / np.linalg.norm(features) * YEAR_WEIGHT
+
+# One unit-length row per distinct (title, year) in a guild, updated in place on insert/remove
+class SuggestionIndex:
+    def __init__(self):
+        self.vocab = {}  # Format: {genre_token: column}, columns after the decade block
+        self.matrix = np.zeros((INITIAL_CAPACITY, DECADE_BINS), dtype=np.float32)
+        self.active = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self.size = 0    # Rows in use so far (high-water mark)
+        self.free = []   # Rows released by removals, reused first
+
+        self.rows = {}          # Format: {(title, year): row}
+        self.movies = {}        # Format: {row: movie dict}
+        self.row_parties = {}   # Format: {row: {watchparty: entries with this (title, year)}}
+        self.party_rows = {}    # Format: {watchparty: {row, ...}}
+
+    @classmethod
+    def from_db(cls, db):
+        index = cls()
+        for watchparty, movies in db.items():
+            for movie in movies:
+                index.add(watchparty, movie)
+        return index
+
+    def _column(self, token):
+        if token not in self.vocab:
+            self.vocab[token] = DECADE_BINS + len(self.vocab)
+            if self.vocab[token] >= self.matrix.shape[1]:
+                # Double the genre columns; existing rows stay unit length (new columns are zero)
+                extra = max(len(self.vocab), 8)
+                self.matrix = np.hstack([self.matrix, np.zeros((self.matrix.shape[0], extra), dtype=np.float32)])
+        return self.vocab[token]
+
+    def _vector(self, movie):
+        # Register genre columns first; this may widen the matrix
+        columns = sorted({self._column(t.lower()) for t in genre_tokens(movie.get("genre"))})
+        vector = np.zeros(self.matrix.shape[1], dtype=np.float32)
+
+        vector[:DECADE_BINS] = decade_features(movie.get("year"))
+        if columns:
+            vector[columns] = 1.0 / np.sqrt(len(columns))
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _allocate(self):
+        if self.free:
+            return self.free.pop()
+        if self.size == self.matrix.shape[0]:
+            self.matrix = np.vstack([self.matrix, np.zeros_like(self.matrix)])
+            self.active = np.concatenate([self.active, np.zeros_like(self.active)])
+        self.size += 1
+        return self.size - 1
+
+    # ➕ Movie added to a watchparty
+    def add(self, watchparty, movie):
+        key = movie_key(movie)
+        row = self.rows.get(key)
+
+        if row is None:
+            vector = self._vector(movie)
+            row = self._allocate()
+            self.matrix[row] = vector
+            self.active[row] = True
+            self.rows[key] = row
+            self.movies[row] = movie
+            self.row_parties[row] = {}
+
+        # Count entries: a watchparty can hold the same (title, year) more than once
+        counts = self.row_parties[row]
+        counts[watchparty] = counts.get(watchparty, 0) + 1
+        self.party_rows.setdefault(watchparty, set()).add(row)
+
+    # ➖ Movie removed from a watchparty (the row goes once no watchparty holds it)
+    def remove(self, watchparty, movie):
+        row = self.rows.get(movie_key(movie))
+        if row is None or watchparty not in self.row_parties[row]:
+            return
+
+        # Only forget the watchparty once its last entry for this movie is gone
+        counts = self.row_parties[row]
+        counts[watchparty] -= 1
+        if counts[watchparty] <= 0:
+            del counts[watchparty]
+            self.party_rows.get(watchparty, set()).discard(row)
+
+        if not self.row_parties[row]:
+            del self.rows[movie_key(movie)], self.movies[row], self.row_parties[row]
+            self.matrix[row] = 0.0
+            self.active[row] = False
+            self.free.append(row)
+
+    def find(self, watchparty, title):
+        title = title.lower().strip()
+        for row in self.party_rows.get(watchparty, ()):
+            if self.movies[row]["title"].lower().strip() == title:
+                return row
+        return None
+
+    # 🔮 Top matches for a seed movie (or the watchparty's centroid) that the watchparty doesn't have yet
+    def suggest(self, watchparty, seed_row=None, limit=5):
+        """
+        Returns [(movie, score, watchparties)] for the `limit` rows most similar
+        to `seed_row`, or to the average of every movie in `watchparty` when no
+        seed is given. The seed and movies already in `watchparty` are never suggested.
+        """
+        seen = self.party_rows.get(watchparty, set())
+        if seed_row is not None:
+            query = self.matrix[seed_row]
+        elif seen:
+            query = self.matrix[list(seen)].sum(axis=0)
+        else:
+            return []
+
+        scores = self.matrix[:self.size] @ query
+        scores[~self.active[:self.size]] = -np.inf
+        if seen:
+            scores[list(seen)] = -np.inf
+        if seed_row is not None:
+            scores[seed_row] = -np.inf
+
+        candidates = int(np.isfinite(scores).sum())
+        if not candidates:
+            return []
+
+        limit = min(limit, candidates)
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best])]
+
+        norm = np.linalg.norm(query) or 1.0
+        return [
+            (self.movies[row], float(scores[row] / norm), sorted(self.row_parties[row]))
+            for row in best
+        ]
@@ -0,0 +1,194 @@
+# Cross-process change notifications so every shard process keeps its caches coherent
+import asyncio
+import glob
+import json
+import os
+import socket
+import time
+
+from storage import DATA_DIR, file_lock
+
+RUN_DIR = os.path.join(DATA_DIR, "run")
+POLL_INTERVAL = 1.0  # Seconds between change-log polls on platforms without Unix sockets
+MAX_LOG_BYTES = 1024 * 1024  # Change log is rotated once it grows past this
+RECEIVE_BUFFER = 1024 * 1024  # Room for bursts of change notices before datagrams get dropped
+
+# 📣 Broadcasts "partition X changed document Y" to every other bot process via Unix datagram sockets
+class SocketChangeBus:
+    def __init__(self, run_dir=RUN_DIR):
+        self.run_dir = run_dir
+        self.address = os.path.join(run_dir, f"{os.getpid()}.sock")
+        self.handlers = []  # Callbacks taking (partition_key, document_name)
+
+        # Unbound sender so tools can publish without ever calling start()
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._receiver = None
+
+    def subscribe(self, handler):
+        self.handlers.append(handler)
+
+    # Bind this process's socket and start listening on the event loop
+    def start(self):
+        if self._receiver is not None:
+            return
+
+        os.makedirs(self.run_dir, exist_ok=True)
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+        self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        self._receiver.bind(self.address)
+        self._receiver.setblocking(False)
+        asyncio.get_running_loop().add_reader(self._receiver.fileno(), self._on_readable)
+
+    def close(self):
+        if self._receiver is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._receiver.fileno())
+        self._receiver.close()
+        self._receiver = None
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+    # Swap in an empty log with a fresh generation header (caller holds the log lock)
+    def _new_generation(self):
+        tmp_path = f"{self.log_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"generation": time.time_ns()}) + "\n")
+        os.replace(tmp_path, self.log_path)
+
+    def publish(self, key, name):
+        payload = json.dumps({"pid": os.getpid(), "key": key, "doc": name}).encode()
+
+        for address in glob.glob(os.path.join(self.run_dir, "*.sock")):
+            if address == self.address:
+                continue
+            try:
+                self._sender.sendto(payload, address)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Socket left behind by a process that exited — clean it up
+                try:
+                    os.unlink(address)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                # The notice is lost: that process keeps serving its cached copy until it reloads
+                # the partition (eviction or a later notice for the same document)
+                print(f"⚠️ Change queue full for {address}; it may serve stale '{name}' for partition {key}.")
+
+    def _on_readable(self):
+        while True:
+            try:
+                payload = self._receiver.recv(4096)
+            except BlockingIOError:
+                return
+
+            message = json.loads(payload)
+            for handler in self.handlers:
+                handler(message["key"], message["doc"])
+
+# 📓 Stand-in for platforms without AF_UNIX: an append-only change log guarded by a file lock.
+# The first line of the log is a generation header; the log is swapped for a fresh one once it
+# passes MAX_LOG_BYTES, and pollers that see a new generation drop every cached partition.
+class FileChangeBus:
+    def __init__(self, run_dir=RUN_DIR, poll_interval=POLL_INTERVAL, max_bytes=MAX_LOG_BYTES):
+        self.run_dir = run_dir
+        self.log_path = os.path.join(run_dir, "changes.log")
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self.handlers = []
+        self._generation = None
+        self._offset = 0
+        self._poller = None
+
+    def subscribe(self, handler):
+        self.handlers.append(handler)
+
+    def start(self):
+        if self._poller is not None:
+            return
+
+        os.makedirs(self.run_dir, exist_ok=True)
+
+        # Only changes made after startup matter; everything earlier is already on disk.
+        # Create the log if needed so a rotation before our first poll still shows up as a new generation
+        with file_lock(self.log_path):
+            if not os.path.exists(self.log_path):
+                self._new_generation()
+            with open(self.log_path, "rb") as f:
+                self._generation = self._header(f)
+                f.seek(0, os.SEEK_END)
+                self._offset = f.tell()
+        self._poller = asyncio.create_task(self._poll())
+
+    def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    @staticmethod
+    def _header(f):
+        try:
+            return json.loads(f.readline()).get("generation")
+        except ValueError:
+            return None
+
+    # Swap in an empty log with a fresh generation header (caller holds the log lock)
+    def _new_generation(self):
+        tmp_path = f"{self.log_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"generation": time.time_ns()}) + "\n")
+        os.replace(tmp_path, self.log_path)
+
+    def publish(self, key, name):
+        os.makedirs(self.run_dir, exist_ok=True)
+        line = json.dumps({"pid": os.getpid(), "key": key, "doc": name})
+        with file_lock(self.log_path):
+            # Start a new generation when the log is missing or too big (swapped in atomically)
+            if not os.path.exists(self.log_path) or os.path.getsize(self.log_path) > self.max_bytes:
+                self._new_generation()
+
+            with open(self.log_path, "a") as f:
+                f.write(line + "\n")
+
+    def _notify(self, key, name):
+        for handler in self.handlers:
+            handler(key, name)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not os.path.exists(self.log_path):
+                continue
+
+            with open(self.log_path, "rb") as f:
+                generation = self._header(f)
+                if generation != self._generation:
+                    # Log was rotated (or deleted and recreated); notices we hadn't read yet are gone,
+                    # so reload everything
+                    self._notify(None, None)
+                    self._generation = generation
+                    self._offset = f.tell()
+
+                f.seek(self._offset)
+                chunk = f.read()
+
+            # Leave a half-written last line for the next poll
+            complete, _, _ = chunk.rpartition(b"\n")
+            if not complete:
+                continue
+            self._offset += len(complete) + 1
+
+            for line in complete.splitlines():
+                message = json.loads(line)
+                if message["pid"] == os.getpid():
+                    continue
+                self._notify(message["key"], message["doc"])
+
+# Pick the best bus available on this platform
+def create_change_bus(run_dir=RUN_DIR):
+    if hasattr(socket, "AF_UNIX"):
+        return SocketChangeBus(run_dir)
+    return FileChangeBus(run_dir)
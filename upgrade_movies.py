@@ -1,8 +1,7 @@
-import json
 import os
-
-CATEGORY_FILE = "categories.json"
-MOVIE_DB_FILE = "movies.json"
+from storage import GuildStore, DOCUMENTS
+from sync import create_change_bus
+from stats import rebuild_stats
 
 # 💡 Patches missing fields for legacy entries
 def fill_defaults(entry):
@@ -14,41 +13,39 @@ def fill_defaults(entry):
         "added_by": entry.get("added_by", "Unknown"),
     }
 
-# 📖 Load the current list of categories
-def load_categories():
-    if not os.path.exists(CATEGORY_FILE):
-        with open(CATEGORY_FILE, "w") as f:
-            json.dump(["Horror"], f)  # Default fallback if category file doesn't exist
-    with open(CATEGORY_FILE, "r") as f:
-        return json.load(f)
-
-def upgrade():
-    if not os.path.exists(MOVIE_DB_FILE):
-        print("❌ No movies.json file found to upgrade.")
-        return
-
-    with open(MOVIE_DB_FILE, "r") as f:
-        data = json.load(f)
-
+def upgrade_partition(partition):
     # ✅ Already upgraded
-    if isinstance(data, dict):
-        print("✅ movies.json is already using the upgraded category format.")
+    if isinstance(partition.movies(), dict):
+        print(f"✅ [{partition.key}] movies.json is already using the upgraded category format.")
         return
 
     # 🧪 Upgrade from flat list → category dict
-    fallback_category = load_categories()[0]
-    print(f"🔧 Detected legacy format. Upgrading movies to category: '{fallback_category}'")
+    fallback_category = partition.watchparties()[0]
+    print(f"🔧 [{partition.key}] Detected legacy format. Upgrading movies to category: '{fallback_category}'")
 
-    upgraded = {fallback_category: []}
+    def to_categories(data):
+        if isinstance(data, dict):
+            return data  # Another process upgraded it in the meantime
+        return {fallback_category: [fill_defaults(entry) for entry in data]}
 
-    for entry in data:
-        patched = fill_defaults(entry)
-        upgraded[fallback_category].append(patched)
+    upgraded = partition.update("movies", to_categories, replace=True)
 
-    with open(MOVIE_DB_FILE, "w") as f:
-        json.dump(upgraded, f, indent=2)
+    # Stats were never counted for the legacy list, so recount them from the upgraded movies
+    rebuild_stats(partition)
+
+    print(f"✅ [{partition.key}] Upgrade complete. {len(upgraded[fallback_category])} entries moved to '{fallback_category}'.")
+
+def upgrade():
+    store = GuildStore(bus=create_change_bus())
+    movies_file = DOCUMENTS["movies"][0]
+    keys = [k for k in store.partition_keys() if os.path.exists(os.path.join(store.root, k, movies_file))]
+
+    if not keys:
+        print("❌ No movies.json file found to upgrade.")
+        return
 
-    print(f"✅ Upgrade complete. {len(data)} entries moved to '{fallback_category}'.")
+    for key in keys:
+        upgrade_partition(store.partition(key))
 
 if __name__ == "__main__":
     upgrade()
\ No newline at end of file
@@ -2,14 +2,16 @@
 import discord
 from discord.ext import commands
 import random
-import json
 from datetime import datetime
 
 # Define the WatchpartyVote Cog
 class WatchpartyVote(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, store):
         self.bot = bot
 
+        # Per-guild storage partitions (schedules live alongside each guild's movies)
+        self.store = store
+
         # Predefined pool of horror movie titles to randomly sample from
         self.movie_pool = [
             "Alien", "The Thing", "Hereditary", "Get Out", "The Babadook",
@@ -105,6 +107,7 @@ class WatchpartyVote(commands.Cog):
 
     # Show results of the vote
     @commands.command(name="show_results")
+    @commands.guild_only()
     async def show_results(self, ctx):
         
         # Verify an active voting session exists
@@ -155,20 +158,10 @@ class WatchpartyVote(commands.Cog):
         await ctx.send(embed=embed)
 
         # Store results for scheduling purposes
-        await self.save_schedule("Horror", top_3)
+        await self.save_schedule(ctx.guild.id, "Horror", top_3)
 
     # Save Voting Results to a JSON file 
-    async def save_schedule(self, category, top_3):
-        schedule_path = "watchparty_schedule.json"
-
-        try:
-            # Load existing scheduling data from file
-            with open(schedule_path, "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            # Create new data structure if file doesn't exist
-            data = {}
-
+    async def save_schedule(self, guild_id, category, top_3):
         formatted_top_3 = []
         # Format each top movie with default streaming platform set to N/A
         for vote_id, title, count, percent in top_3:
@@ -180,15 +173,14 @@ class WatchpartyVote(commands.Cog):
             })
 
         # Update the selected category with the new top 3 and metadata
-        data[category] = {
+        entry = {
             "day": self.get_day_for_category(category),
             "last_updated": datetime.utcnow().isoformat(),
             "top_3": formatted_top_3
         }
 
-        # Write updated data back to the JSON file
-        with open(schedule_path, "w") as f:
-            json.dump(data, f, indent=4)
+        # Write it into this guild's schedule file only (locked against other shard processes)
+        await self.store.get(guild_id).update_async("schedule", lambda data: data.update({category: entry}))
 
     # Day of the Week Mapping Helper
     def get_day_for_category(self, category):
@@ -214,23 +206,17 @@ class WatchpartyVote(commands.Cog):
 
     #Schedule Watchparty Command
     @commands.command(name="schedule_watchparty")
+    @commands.guild_only()
     async def schedule_watchparty(self, ctx, category: str = "Horror"):
         """
-        Reads the saved top 3 movies from the watchparty_schedule.json file
-        and announces the upcoming Watchparty lineup for a given category.
+        Reads the saved top 3 movies from this guild's watchparty_schedule.json
+        partition and announces the upcoming Watchparty lineup for a given category.
         """
 
-        import json
-
-        schedule_path = "watchparty_schedule.json"
-
-        try:
-            # Open the JSON file that stores schedule data
-            with open(schedule_path, "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            # Inform user if no schedule data exists yet
-            await ctx.send("⚠️ No schedule file found. Try running /show_results first.")
+        data = self.store.get(ctx.guild.id).schedule()
+        if not data:
+            # Inform user if no schedule data exists yet for this guild
+            await ctx.send("⚠️ No schedule found yet. Try running /show_results first.")
             return
 
         # Normalize category name capitalization